@@ -1,5 +1,6 @@
 import os
-from sqlalchemy import create_engine, func
+import time
+from sqlalchemy import create_engine, func, insert, select, update
 from sqlalchemy.orm import sessionmaker, Session
 from dotenv import load_dotenv
 from models import Base, Repository, AiderExecutionLog, RequestLog, ApiMetricLog, Job, User, BugReport, Vulnerability
@@ -21,7 +22,21 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set.")
 
-engine = create_engine(DATABASE_URL)
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite (tests, local dev) ignores server-side pool tuning.
+    engine = create_engine(DATABASE_URL)
+else:
+    # Sized for the request paths plus the background worker; pre_ping weeds
+    # out connections dropped by the server or PgBouncer, recycle beats
+    # server-side idle timeouts.
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=20,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class RDBMS:
@@ -30,9 +45,14 @@ class RDBMS:
     Stores request logs, execution history, and basic metrics.
     """
 
+    # Repo lists barely change in steady state; 30s staleness is fine for
+    # the list views and the worker loop, and writers invalidate anyway.
+    _REPO_LIST_TTL = 30
+
     def __init__(self):
         # Only initialize tables for PostgreSQL using SQLAlchemy
         self.init_db()
+        self._repo_list_cache: Dict[Optional[int], tuple] = {}
 
     def init_db(self):
         """Create all tables if they don't exist (PostgreSQL)."""
@@ -65,6 +85,7 @@ class RDBMS:
         session.refresh(repo)  # Ensure repo.id is populated with the actual integer value
         repo_id = getattr(repo, "id", None)
         session.close()
+        self.invalidate_repo_cache()
         return repo_id
 
     def get_repository(self, repo_id: int, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
@@ -79,8 +100,16 @@ class RDBMS:
         session.close()
         return to_dict(repo) if repo else None
 
+    def invalidate_repo_cache(self):
+        """Drop cached repository lists; called after any repo write."""
+        self._repo_list_cache.clear()
+
     def get_all_repositories(self, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get all active repositories, optionally filtered by user."""
+        cached = self._repo_list_cache.get(user_id)
+        if cached is not None and cached[0] > time.time():
+            return cached[1]
+
         session = self.get_session()
         query = session.query(Repository).filter(Repository.is_active == True)
         
@@ -89,7 +118,9 @@ class RDBMS:
             
         repos = query.order_by(Repository.name).all()
         session.close()
-        return [repo_dict for repo_dict in (to_dict(repo) for repo in repos) if repo_dict is not None]
+        result = [repo_dict for repo_dict in (to_dict(repo) for repo in repos) if repo_dict is not None]
+        self._repo_list_cache[user_id] = (time.time() + self._REPO_LIST_TTL, result)
+        return result
 
     def update_repository(self, repo_id: int, user_id: Optional[int] = None, **kwargs) -> bool:
         """Update repository information, optionally checking ownership."""
@@ -107,6 +138,7 @@ class RDBMS:
         setattr(repo, "updated_at", datetime.now())
         session.commit()
         session.close()
+        self.invalidate_repo_cache()
         return True
 
     def delete_repository(self, repo_id: int, user_id: Optional[int] = None) -> bool:
@@ -123,6 +155,7 @@ class RDBMS:
         session.delete(repo)
         session.commit()
         session.close()
+        self.invalidate_repo_cache()
         return True
 
     def get_repo_history(self, repo_path: str, limit: int = 20):
@@ -152,35 +185,34 @@ class RDBMS:
                     instructions: Optional[str] = None, dry_run: bool = False, status: str = "processing") -> int:
         """Log a new API request and return its ID."""
         session = self.get_session()
-        log = RequestLog(
-            endpoint=endpoint,
-            repo_id=repo_id,
-            repo_path=repo_path,
-            instructions=instructions,
-            dry_run=str(dry_run),
-            status=status,
-            created_at=datetime.utcnow()
-        )
-        session.add(log)
+        # INSERT ... RETURNING id: one round-trip instead of insert + refresh
+        log_id = session.execute(
+            insert(RequestLog).values(
+                endpoint=endpoint,
+                repo_id=repo_id,
+                repo_path=repo_path,
+                instructions=instructions,
+                dry_run=str(dry_run),
+                status=status,
+                created_at=datetime.utcnow()
+            ).returning(RequestLog.id)
+        ).scalar_one()
         session.commit()
-        session.refresh(log)  # Ensure log.id is populated with the actual integer value
-        log_id = getattr(log, "id", None)
         session.close()
-        if log_id is None:
-            raise ValueError("Failed to retrieve log ID after insertion.")
         return log_id
 
     def log_api_metric(self, endpoint: str, repo_id: int, metric_name: str, metric_value: float):
         """Log an API metric event."""
         session = self.get_session()
-        log = ApiMetricLog(
-            endpoint=endpoint,
-            repo_id=repo_id,
-            metric_name=metric_name,
-            metric_value=metric_value,
-            created_at=datetime.utcnow()
+        session.execute(
+            insert(ApiMetricLog).values(
+                endpoint=endpoint,
+                repo_id=repo_id,
+                metric_name=metric_name,
+                metric_value=metric_value,
+                created_at=datetime.utcnow()
+            )
         )
-        session.add(log)
         session.commit()
         session.close()
 
@@ -189,17 +221,18 @@ class RDBMS:
                            repo_id: Optional[int] = None):
         """Log an Aider execution to the database."""
         session = self.get_session()
-        log = AiderExecutionLog(
-            repo_path=repo_path,
-            instructions=instructions,
-            returncode=returncode,
-            stdout=stdout,
-            stderr=stderr,
-            execution_time=execution_time,
-            repo_id=repo_id,
-            created_at=datetime.utcnow()
+        session.execute(
+            insert(AiderExecutionLog).values(
+                repo_path=repo_path,
+                instructions=instructions,
+                returncode=returncode,
+                stdout=stdout,
+                stderr=stderr,
+                execution_time=execution_time,
+                repo_id=repo_id,
+                created_at=datetime.utcnow()
+            )
         )
-        session.add(log)
         session.commit()
         session.close()
 
@@ -299,19 +332,16 @@ class RDBMS:
     def create_job(self, repo_id: int, instructions: str, user_id: Optional[int] = None) -> int:
         """Create a new job for a repository."""
         session = self.get_session()
-        job = Job(
-            repo_id=repo_id,
-            user_id=user_id,
-            instructions=instructions,
-            status="pending"
-        )
-        session.add(job)
+        job_id = session.execute(
+            insert(Job).values(
+                repo_id=repo_id,
+                user_id=user_id,
+                instructions=instructions,
+                status="pending"
+            ).returning(Job.id)
+        ).scalar_one()
         session.commit()
-        session.refresh(job)  # Ensure job.id is populated with the actual integer value
-        job_id = getattr(job, "id", None)
         session.close()
-        if job_id is None:
-            raise ValueError("Failed to retrieve job ID after insertion.")
         return job_id
 
     def get_user_job_count(self, user_id: int, start_date: Optional[datetime] = None) -> int:
@@ -324,6 +354,67 @@ class RDBMS:
         session.close()
         return count
 
+    def get_pending_jobs_by_repo(self) -> List[tuple]:
+        """Single query replacing the worker's per-repo probes: returns
+        (repo, oldest pending job) pairs for every active repository that has
+        no running or completed-awaiting-approval job."""
+        session = self.get_session()
+        try:
+            blocked = (
+                session.query(Job.repo_id)
+                .filter(Job.status.in_(("running", "completed")))
+            )
+            # min(id) per repo picks the oldest pending job (ids follow
+            # insertion order, which matches created_at ordering).
+            next_ids = (
+                session.query(func.min(Job.id))
+                .filter(Job.status == "pending")
+                .group_by(Job.repo_id)
+            )
+            rows = (
+                session.query(Repository, Job)
+                .join(Job, Job.repo_id == Repository.id)
+                .filter(
+                    Repository.is_active == True,
+                    Job.id.in_(next_ids),
+                    ~Job.repo_id.in_(blocked),
+                )
+                .all()
+            )
+            return [(to_dict(repo), to_dict(job)) for repo, job in rows]
+        finally:
+            session.close()
+
+    def claim_next_job(self, repo_id: int) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest pending job for a repository.
+
+        Marks it running and returns it in a single UPDATE ... RETURNING
+        round-trip (supported by Postgres and SQLite >= 3.35), so two workers
+        can never claim the same job. Returns None when nothing is pending."""
+        session = self.get_session()
+        try:
+            next_id = (
+                select(Job.id)
+                .where(Job.repo_id == repo_id, Job.status == "pending")
+                .order_by(Job.created_at.asc())
+                .limit(1)
+                .scalar_subquery()
+            )
+            # The pending filter must be repeated on the UPDATE itself: under
+            # READ COMMITTED the subquery is planned once, so a racing claimer
+            # that blocked on the row lock would otherwise re-check only the
+            # id and re-claim the now-running job after the winner commits.
+            row = session.execute(
+                update(Job)
+                .where(Job.id == next_id, Job.status == "pending")
+                .values(status="running", started_at=datetime.utcnow())
+                .returning(Job.__table__)
+            ).fetchone()
+            session.commit()
+            return dict(row._mapping) if row else None
+        finally:
+            session.close()
+
     def get_next_job(self, repo_id: int) -> Optional[Dict[str, Any]]:
         """Get the next pending job for a repository, ordered by creation time."""
         session = self.get_session()
@@ -427,18 +518,17 @@ class RDBMS:
         """Log a bug report to the database."""
         session = self.get_session()
         try:
-            bug = BugReport(
-                error_type=error_type,
-                error_message=error_message,
-                stack_trace=stack_trace,
-                endpoint=endpoint,
-                user_id=user_id,
-                created_at=datetime.utcnow()
-            )
-            session.add(bug)
+            bug_id = session.execute(
+                insert(BugReport).values(
+                    error_type=error_type,
+                    error_message=error_message,
+                    stack_trace=stack_trace,
+                    endpoint=endpoint,
+                    user_id=user_id,
+                    created_at=datetime.utcnow()
+                ).returning(BugReport.id)
+            ).scalar_one()
             session.commit()
-            session.refresh(bug)
-            bug_id = bug.id
             return bug_id
         except Exception as e:
             logger.error(f"Failed to log bug: {e}")
@@ -446,6 +536,47 @@ class RDBMS:
         finally:
             session.close()
 
+    def log_bug_and_queue_fix(self, error_type: str, error_message: str, stack_trace: str = None,
+                              endpoint: str = None, user_id: int = None, repo_id: Optional[int] = None,
+                              instructions: Optional[str] = None) -> tuple:
+        """Log a bug report and, when a repository is known, queue its auto-fix
+        job in the same transaction. Returns (bug_id, job_id); job_id is None
+        when no repo/instructions were given."""
+        session = self.get_session()
+        try:
+            queue_fix = repo_id is not None and instructions
+            bug_id = session.execute(
+                insert(BugReport).values(
+                    error_type=error_type,
+                    error_message=error_message,
+                    stack_trace=stack_trace,
+                    endpoint=endpoint,
+                    user_id=user_id if user_id is not None else 0,
+                    status="in_progress" if queue_fix else "open",
+                    created_at=datetime.utcnow()
+                ).returning(BugReport.id)
+            ).scalar_one()
+
+            job_id = None
+            if queue_fix:
+                job_id = session.execute(
+                    insert(Job).values(
+                        repo_id=repo_id,
+                        user_id=user_id,
+                        instructions=instructions,
+                        status="pending"
+                    ).returning(Job.id)
+                ).scalar_one()
+
+            session.commit()
+            return bug_id, job_id
+        except Exception as e:
+            logger.error(f"Failed to log bug: {e}")
+            session.rollback()
+            return None, None
+        finally:
+            session.close()
+
     def update_bug_status(self, bug_id: int, status: str) -> bool:
         """Update the status of a bug report."""
         session = self.get_session()
@@ -498,29 +629,67 @@ class RDBMS:
                          pattern_id: Optional[str] = None, branch: str = "HEAD") -> int:
         """Log a security vulnerability."""
         session = self.get_session()
-        vuln = Vulnerability(
-            repo_id=repo_id,
-            file_path=file_path,
-            description=description,
-            severity=severity,
-            line_number=line_number,
-            pattern_id=pattern_id,
-            branch=branch,
-            status="open",
-            created_at=datetime.utcnow()
-        )
-        session.add(vuln)
+        vuln_id = session.execute(
+            insert(Vulnerability).values(
+                repo_id=repo_id,
+                file_path=file_path,
+                description=description,
+                severity=severity,
+                line_number=line_number,
+                pattern_id=pattern_id,
+                branch=branch,
+                status="open",
+                created_at=datetime.utcnow()
+            ).returning(Vulnerability.id)
+        ).scalar_one()
         session.commit()
-        session.refresh(vuln)
-        vuln_id = getattr(vuln, "id", None)
         session.close()
         return vuln_id
 
-    def get_vulnerabilities(self, repo_id: int, status: Optional[str] = None, branch: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get vulnerabilities for a repository."""
+    def log_vulnerabilities_bulk(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert several vulnerabilities in a single transaction.
+
+        Each row is a dict of Vulnerability column values (repo_id, file_path,
+        description, severity, line_number, pattern_id, branch).
+        """
+        if not rows:
+            return 0
+        session = self.get_session()
+        now = datetime.utcnow()
+        vulns = [
+            Vulnerability(status="open", created_at=now, **row)
+            for row in rows
+        ]
+        session.add_all(vulns)
+        session.commit()
+        session.close()
+        return len(vulns)
+
+    def update_vulnerability_status_bulk(self, vuln_ids: List[int], status: str) -> int:
+        """Update the status of several vulnerabilities in one transaction."""
+        if not vuln_ids:
+            return 0
+        session = self.get_session()
+        values: Dict[str, Any] = {"status": status}
+        if status == "resolved":
+            values["resolved_at"] = datetime.utcnow()
+        updated = (
+            session.query(Vulnerability)
+            .filter(Vulnerability.id.in_(vuln_ids))
+            .update(values, synchronize_session=False)
+        )
+        session.commit()
+        session.close()
+        return updated
+
+    def get_vulnerabilities(self, repo_id: int, status: Optional[str] = None, branch: Optional[str] = None,
+                           statuses: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get vulnerabilities for a repository, filtered by one status or several at once."""
         session = self.get_session()
         query = session.query(Vulnerability).filter(Vulnerability.repo_id == repo_id)
-        if status:
+        if statuses:
+            query = query.filter(Vulnerability.status.in_(statuses))
+        elif status:
             query = query.filter(Vulnerability.status == status)
         if branch:
             query = query.filter(Vulnerability.branch == branch)
@@ -1,21 +1,32 @@
 # server.py
-from fastapi import FastAPI, Request, HTTPException, Header, Depends
+from fastapi import FastAPI, Request, HTTPException, Header, Depends, Response
 import sys
 import asyncio
 from datetime import datetime
 
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, ORJSONResponse
 from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
 from pydantic import BaseModel
+import orjson
+import base64
 import subprocess
 import shlex
 import os
+import re
+import json
+import queue
+import uuid
+import tempfile
+import shutil
+import urllib.parse
+import requests
 from pathlib import Path
 import logging
 import uvicorn
 from typing import Optional, List, Dict
 import time
+from functools import lru_cache
 from threading import Thread
 from database import RDBMS
 from dotenv import load_dotenv
@@ -25,6 +36,7 @@ from database import engine  # Your SQLAlchemy engine from database.py
 from auth import get_current_user
 from auth_routes import router as auth_router
 from security_scanner import SecurityScanner
+from worker import notify_new_job  # worker only imports main lazily, so no cycle
 import traceback
 import openai
 # Load environment variables from .env file
@@ -46,7 +58,13 @@ AIDER_CMD = "aider"  # assume aider is on PATH (or provide full path)
 TIMEOUT_SECONDS = int(os.getenv("AIDER_TIMEOUT_SECONDS", "300"))  # max seconds to let aider run
 
 # Admin Users
-ADMIN_EMAILS = ["novusmundus2025@gmail.com", "batalladavid1984@gmail.com"]
+ADMIN_EMAILS = frozenset({"novusmundus2025@gmail.com", "batalladavid1984@gmail.com"})
+
+def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    """Dependency for admin-only endpoints: 403 unless the user is an admin."""
+    if current_user.get("email") not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
 
 # Git Branch Management
 AUTO_CREATE_BRANCH = os.getenv("AUTO_CREATE_BRANCH", "false").lower() == "true"
@@ -86,6 +104,11 @@ ERROR_REPO_NOT_FOUND = "Repository not found"
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("aider_server")
 
+# === Precompiled patterns (hot request paths) ===
+_GITHUB_URL_RE = re.compile(r'https://github\.com/([^/]+)/([^/]+)(?:\.git)?')
+_NON_ALNUM_RE = re.compile(r'[^a-zA-Z0-9\s]')
+_FILENAME_RE = re.compile(r'\b[\w\-]+\.(?:json|js|ts|py|md|yml|yaml|txt|html|css)\b')
+
 # === Database ===
 db = RDBMS()
 db.init_db() 
@@ -95,7 +118,9 @@ db.init_db()
 ALLOWED_BASE.mkdir(parents=True, exist_ok=True)
 print(f"Base directory ensured: {ALLOWED_BASE}")
 
-app = FastAPI(title="Aider Wrapper API")
+# orjson renders the large list endpoints (repositories, vulnerabilities,
+# jobs) several times faster than the stdlib json encoder.
+app = FastAPI(title="Aider Wrapper API", default_response_class=ORJSONResponse)
 
 # Add CORS middleware for cookie support
 from fastapi.middleware.cors import CORSMiddleware
@@ -120,6 +145,127 @@ app.include_router(auth_router)
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+class _TTLCache:
+    """Tiny in-process cache with per-entry TTL for hot read paths."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if not entry:
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at:
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value):
+        if len(self._data) >= self.maxsize:
+            # Wholesale eviction keeps this O(1); entries rebuild on demand.
+            self._data.clear()
+        self._data[key] = (time.time() + self.ttl, value)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+# User rows (id/plan_type) barely change; a short TTL saves a SELECT per request.
+_USER_CACHE = _TTLCache(maxsize=10_000, ttl=60)
+
+# Frontends poll jobs and repo details on an interval; serve repeats from RAM.
+# Jobs are only cached once terminal so an in-flight status is never stale.
+_JOB_CACHE = _TTLCache(maxsize=5000, ttl=2)
+_REPO_CACHE = _TTLCache(maxsize=2000, ttl=30)
+_TERMINAL_JOB_STATUSES = frozenset({"completed", "failed", "approved", "rejected"})
+
+def get_user_cached(google_id: str) -> Optional[dict]:
+    """Fetch a user by Google ID through the short-lived in-process cache."""
+    user = _USER_CACHE.get(google_id)
+    if user is None:
+        user = db.get_user_by_google_id(google_id)
+        if user:
+            _USER_CACHE.set(google_id, user)
+    return user
+
+@lru_cache(maxsize=1)
+def _cached_repo_for_cwd() -> Optional[dict]:
+    """Repository backing the server's cwd. The cwd never changes for the
+    process lifetime, so this is resolved once; any endpoint that touches
+    repositories.local_path must call cache_clear()."""
+    return db.get_repository_by_local_path(os.getcwd())
+
+# Unhandled-exception reports are queued here and written off the request
+# path by the daemon thread below, so a 500 response never waits on the DB.
+_bug_queue: queue.Queue = queue.Queue()
+
+# Only the tail of a traceback identifies the failing site; storing the full
+# blob in the Text column is what dominates write volume under an error storm.
+_MAX_STACK_TRACE_CHARS = 4096
+
+# format_exc() re-walks the stack and re-reads source lines via linecache on
+# every call; repeated exceptions from one site format once. Keyed by value
+# (type, failing file/line, message), never by exception identity.
+_TRACEBACK_CACHE: Dict[tuple, str] = {}
+_TRACEBACK_CACHE_MAX = 256
+
+def _format_exception_cached(exc: Exception) -> str:
+    """Format an exception's traceback, caching repeats from the same site."""
+    tb = exc.__traceback__
+    if tb is None:
+        return "".join(traceback.TracebackException.from_exception(exc).format())
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    key = (type(exc).__name__, tb.tb_frame.f_code.co_filename, tb.tb_lineno, str(exc))
+    formatted = _TRACEBACK_CACHE.get(key)
+    if formatted is None:
+        formatted = "".join(traceback.TracebackException.from_exception(exc).format())
+        if len(_TRACEBACK_CACHE) >= _TRACEBACK_CACHE_MAX:
+            _TRACEBACK_CACHE.clear()
+        _TRACEBACK_CACHE[key] = formatted
+    return formatted
+
+_FIX_TEMPLATE = """
+CRITICAL BUG FIX REQUIRED
+
+Error Type: {error_type}
+Error Message: {error_message}
+Endpoint: {endpoint}
+
+Stack Trace:
+{stack_trace}
+
+Please analyze the stack trace and fix the bug in the codebase.
+Ensure the fix handles the edge case that caused this error.
+"""
+
+def _drain_bug_queue():
+    """Consume queued bug payloads and persist them in batches."""
+    while True:
+        batch = [_bug_queue.get()]
+        try:
+            while len(batch) < 50:
+                batch.append(_bug_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        for payload in batch:
+            try:
+                error_ref = payload.pop("error_ref")
+                bug_id, job_id = db.log_bug_and_queue_fix(**payload)
+                if job_id is not None:
+                    notify_new_job()
+                    logger.info(f"✅ Auto-fix job {job_id} queued for bug {bug_id} (ref {error_ref})")
+                elif bug_id is not None:
+                    logger.info(f"🐛 Bug {bug_id} logged (ref {error_ref})")
+            except Exception as e:
+                logger.error(f"Failed to persist queued bug report: {e}")
+
+_bug_writer_thread = Thread(target=_drain_bug_queue, daemon=True)
+_bug_writer_thread.start()
+
 class UpdateRequest(BaseModel):
     repo: str                # path relative to ALLOWED_BASE, or absolute (validated)
     instructions: str        # the prompt/instructions to feed to aider
@@ -149,13 +295,11 @@ def generate_semantic_name(instructions: str, max_length: int = 50) -> str:
     - "Fix bug in authentication handler" -> "fix-authentication-handler"
     - "Refactor database connection logic" -> "refactor-database-connection"
     """
-    import re
-    
     if not instructions or not instructions.strip():
         return "update"
-    
+
     # Remove special characters and normalize whitespace
-    sanitized = re.sub(r'[^a-zA-Z0-9\s]', '', instructions.strip())
+    sanitized = _NON_ALNUM_RE.sub('', instructions.strip())
     words = sanitized.split()
     
     # Find action verbs (common first words)
@@ -215,9 +359,6 @@ def create_branch_for_changes(repo_path: Path, instructions: str) -> str:
     - If instructions blank: feature/{update}-{timestamp}
     Returns the branch name created.
     """
-    import datetime
-    import time
-    
     # Ensure repo is initialized
     ensure_repo_initialized(repo_path)
     
@@ -316,7 +457,6 @@ def push_branch_to_remote(repo_path: Path, branch_name: str, github_url: Optiona
         print(f"Git remotes: {remote_check.stdout}")
         push_cmd = ["git", "push", "-u", "origin", branch_name]
         if github_token and github_url:
-            import urllib.parse
             parsed_url = urllib.parse.urlparse(github_url)
             if parsed_url.scheme == 'https':
                 auth_url = f"https://{github_token}@{parsed_url.netloc}{parsed_url.path}"
@@ -364,8 +504,6 @@ def wait_for_ci_success(github_url: str, branch_name: str, github_token: str, ma
     Wait for CI/CD to complete successfully on a branch.
     Returns True if all checks pass, False if they fail or timeout.
     """
-    import time
-
     max_wait_seconds = max_wait_minutes * 60
     check_interval = 30  # Check every 30 seconds
     start_time = time.time()
@@ -407,11 +545,8 @@ def check_workflow_runs(github_url: str, branch_name: str, github_token: str) ->
     Returns dict with workflow run information.
     """
     try:
-        import re
-        import requests
-        
         # Extract owner and repo from GitHub URL
-        match = re.match(r'https://github\.com/([^/]+)/([^/]+)(?:\.git)?', github_url)
+        match = _GITHUB_URL_RE.match(github_url)
         if not match:
             return {"has_running_workflows": False, "error": "Invalid GitHub URL format", "safe_to_proceed": True}
         
@@ -458,9 +593,6 @@ def check_workflow_runs(github_url: str, branch_name: str, github_token: str) ->
             print(f"GitHub API returned {response.status_code} when checking workflows")
             return {"has_running_workflows": False, "safe_to_proceed": True, "error": f"GitHub API error: {response.status_code}"}
             
-    except ImportError:
-        print("requests library not installed")
-        return {"has_running_workflows": False, "safe_to_proceed": True, "error": "requests library not installed"}
     except Exception as e:
         print(f"Error checking workflows: {e}")
         return {"has_running_workflows": False, "safe_to_proceed": True, "error": str(e)}
@@ -471,11 +603,8 @@ def get_ci_status(github_url: str, branch_name: str, github_token: str) -> dict:
     Returns dict with CI status information.
     """
     try:
-        import re
-        import requests
-        
         # Extract owner and repo from GitHub URL
-        match = re.match(r'https://github\.com/([^/]+)/([^/]+)(?:\.git)?', github_url)
+        match = _GITHUB_URL_RE.match(github_url)
         if not match:
             return {"status": "unknown", "error": "Invalid GitHub URL format"}
         
@@ -509,9 +638,6 @@ def get_ci_status(github_url: str, branch_name: str, github_token: str) -> dict:
         else:
             return {"status": "unknown", "error": f"GitHub API error: {response.status_code}"}
             
-    except ImportError:
-        print(f"requests library not installed")
-        return {"status": "unknown", "error": "requests library not installed"}
     except Exception as e:
         return {"status": "unknown", "error": str(e)}
 
@@ -525,11 +651,8 @@ def create_pull_request(github_url: str, branch_name: str, instructions: str, ba
         print("GitHub token required for pull request creation. Please provide it in the web interface.")
         return {"success": False, "error": "GitHub token required for pull request creation. Please provide it in the web interface."}
     try:
-        import re
-        import requests
-
         # Extract owner and repo from GitHub URL
-        match = re.match(r'https://github\.com/([^/]+)/([^/]+)(?:\.git)?', github_url)
+        match = _GITHUB_URL_RE.match(github_url)
         if not match:
             print(f"Invalid GitHub URL format: {github_url}")
             return {"success": False, "error": "Invalid GitHub URL format. Expected https://github.com/<owner>/<repo>.git"}
@@ -607,14 +730,27 @@ def create_pull_request(github_url: str, branch_name: str, instructions: str, ba
             print(error_msg)
             return {"success": False, "error": error_msg}
 
-    except ImportError:
-        print("requests library not installed")
-        return {"success": False, "error": "requests library not installed"}
     except Exception as e:
         error_msg = f"Failed to create pull request: {str(e)}"
         print(error_msg)
         return {"success": False, "error": error_msg}
 
+# Matches "  origin/<branch>" lines from `git branch -r`; skips the
+# "origin/HEAD -> origin/master" pointer line in one pass.
+_REMOTE_BRANCH_RE = re.compile(r'^\s*origin/(?!HEAD\b)(\S+)\s*$', re.M)
+
+def list_remote_branches(repo_path: Path) -> List[str]:
+    """Fetch remotes and return remote branch names without the origin/ prefix."""
+    subprocess.run(["git", "fetch", "--all"], cwd=str(repo_path), check=True, capture_output=True)
+    result = subprocess.run(
+        ["git", "branch", "-r"],
+        cwd=str(repo_path),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return _REMOTE_BRANCH_RE.findall(result.stdout)
+
 def get_current_branch(repo_path: Path) -> str:
     """Get the current git branch name."""
     try:
@@ -654,9 +790,8 @@ def extract_filenames_from_instructions(instructions: str) -> List[str]:
     """
     Extract filenames from instructions using a regex for common file patterns.
     """
-    import re
     # Match filenames like package.json, app.js, index.js, *.py, *.ts, *.md, etc.
-    return re.findall(r'\b[\w\-]+\.(?:json|js|ts|py|md|yml|yaml|txt|html|css)\b', instructions)
+    return _FILENAME_RE.findall(instructions)
 
 def run_aider(repo_path: Path, instructions: str, dry_run: bool=False, repo_id: Optional[int] = None, github_url: Optional[str] = None, github_token: Optional[str] = None, pr_target_branch: str = "master"):
     print(f"run_aider: repo_path={repo_path}, instructions={instructions}, dry_run={dry_run}, repo_id={repo_id}, github_url={github_url}, github_token={'set' if github_token else 'unset'}, pr_target_branch={pr_target_branch}")
@@ -930,66 +1065,88 @@ def manage_files(repo_path: Path, files_to_delete: List[str], files_to_create: O
 
 # === Endpoints ===
 
+@lru_cache(maxsize=None)
+def _static_stat(path: str) -> os.stat_result:
+    """Cache stat results for the static pages; they don't change at runtime."""
+    return os.stat(path)
+
+def _page_response(path: str) -> FileResponse:
+    """FileResponse with a cached stat_result so the server can go straight to
+    sendfile (uvicorn's zero-copy send extension) without re-stat-ing per hit."""
+    return FileResponse(path, stat_result=_static_stat(path))
+
 @app.get("/")
 async def root():
     """Serve the landing page."""
-    return FileResponse('static/landing.html')
+    return _page_response('static/landing.html')
 
 @app.get("/dashboard")
 async def dashboard():
     """Serve the main application dashboard."""
-    return FileResponse('static/index.html')
+    return _page_response('static/index.html')
 
 @app.get("/pricing")
 async def pricing_page():
     """Serve the pricing page."""
-    return FileResponse('static/pricing.html')
+    return _page_response('static/pricing.html')
 
 @app.get("/help")
 async def help_page():
     """Serve the help/faq page."""
-    return FileResponse('static/help.html')
+    return _page_response('static/help.html')
 
 @app.get("/bugs")
 async def bugs_page():
     """Serve the system diagnostics page."""
-    return FileResponse('static/bugs.html')
+    return _page_response('static/bugs.html')
 
 @app.get("/vulnerabilities")
 async def vulnerabilities_page():
     """Serve the vulnerability scan page."""
-    return FileResponse('static/vulnerabilities.html')
+    return _page_response('static/vulnerabilities.html')
 
 
-
-@app.get("/login.html")
-async def login_page():
-    """Serve the login page with injected configuration."""
+def _render_login_page() -> Optional[str]:
+    """Render login.html with the Google Client ID injected. The client ID is
+    fixed at startup, so the rendered page is cached for the process lifetime."""
     try:
         with open('static/login.html', 'r', encoding='utf-8') as f:
             content = f.read()
-        
-        # Inject Google Client ID
-        client_id = os.getenv("GOOGLE_CLIENT_ID", "")
-        content = content.replace("YOUR_GOOGLE_CLIENT_ID", client_id)
-        
-        return HTMLResponse(content=content)
+        return content.replace("YOUR_GOOGLE_CLIENT_ID", os.getenv("GOOGLE_CLIENT_ID", ""))
     except Exception as e:
-        logger.error(f"Error serving login page: {e}")
-        return FileResponse('static/login.html')
+        logger.error(f"Error rendering login page: {e}")
+        return None
+
+_LOGIN_PAGE_HTML = _render_login_page()
+
+@app.get("/login.html")
+async def login_page():
+    """Serve the login page with injected configuration."""
+    if _LOGIN_PAGE_HTML is not None:
+        return HTMLResponse(content=_LOGIN_PAGE_HTML)
+    return FileResponse('static/login.html')
+
+# These payloads never change at runtime, so serialize them once at startup
+# instead of paying an env lookup plus JSON encode per request.
+_CONFIG_BODY = orjson.dumps({
+    "api_base": API_BASE_URL,
+    "environment": ENVIRONMENT,
+    "google_client_id": os.getenv("GOOGLE_CLIENT_ID", "")
+})
+_STATUS_BODY = orjson.dumps({"ok": True, "message": "Aider wrapper running", "database": "connected"})
 
 @app.get("/api/config")
 async def get_config():
     """Get frontend configuration (API base URL, environment, Google Client ID, etc.)."""
-    return {
-        "api_base": API_BASE_URL,
-        "environment": ENVIRONMENT,
-        "google_client_id": os.getenv("GOOGLE_CLIENT_ID", "")
-    }
+    return Response(
+        _CONFIG_BODY,
+        media_type="application/json",
+        headers={"Cache-Control": "public, max-age=60"}
+    )
 
 @app.get("/status")
 async def status():
-    return {"ok": True, "message": "Aider wrapper running", "database": "connected"}
+    return Response(_STATUS_BODY, media_type="application/json")
 
 # Repository Management Endpoints
 @app.post("/repositories")
@@ -999,32 +1156,41 @@ async def add_repository(repo: RepositoryRequest, current_user: dict = Depends(g
 
     try:
         # Check if the branch exists on the remote repository
-        import requests
-        import re
-        match = re.match(r'https://github\.com/([^/]+)/([^/]+)(?:\.git)?', repo.github_url)
+        match = _GITHUB_URL_RE.match(repo.github_url)
         if not match:
             raise HTTPException(status_code=400, detail="Invalid GitHub URL format.")
-        owner, repo_name = match.groups()
-        repo_name = repo_name.replace('.git', '')
-        branch_check_url = f"https://api.github.com/repos/{owner}/{repo_name}/branches/{repo.branch}"
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        if repo.github_token:
-            headers["Authorization"] = f"token {repo.github_token}"
-        branch_response = requests.get(branch_check_url, headers=headers)
-        if branch_response.status_code != 200:
-            # Check if repo exists at all
-            repo_check_url = f"https://api.github.com/repos/{owner}/{repo_name}"
-            repo_response = requests.get(repo_check_url, headers=headers)
-            
-            if repo_response.status_code == 200:
-                # Repo exists, check if it's empty (size 0)
-                repo_data = repo_response.json()
-                if repo_data.get('size', 0) == 0:
-                    print(f"Repository '{repo_name}' appears to be empty. Proceeding without branch check.")
-                else:
-                     raise HTTPException(status_code=400, detail=f"Branch '{repo.branch}' does not exist on remote repository.")
+
+        # One `git ls-remote` validates URL, repo existence, and branch presence
+        # in a single network round-trip (vs two GitHub REST calls before).
+        ls_remote_url = repo.github_url
+
+        git_env = os.environ.copy()
+        git_env["GIT_TERMINAL_PROMPT"] = "0"  # never block on credential prompts
+        if repo.github_token and repo.github_url.startswith('https://'):
+            # The token travels as an HTTP header injected through git's
+            # environment config, never in the URL or argv where it would be
+            # visible in ps//proc for the life of the process.
+            basic = base64.b64encode(f"x-access-token:{repo.github_token}".encode()).decode()
+            git_env["GIT_CONFIG_COUNT"] = "1"
+            git_env["GIT_CONFIG_KEY_0"] = "http.extraHeader"
+            git_env["GIT_CONFIG_VALUE_0"] = f"Authorization: Basic {basic}"
+        branch_check = subprocess.run(
+            ["git", "ls-remote", "--exit-code", "--heads", ls_remote_url, repo.branch],
+            capture_output=True, text=True, timeout=30, env=git_env
+        )
+        if branch_check.returncode == 2:
+            # Branch missing — but a completely empty repository also returns 2,
+            # so probe whether the remote has any refs at all before rejecting.
+            refs_check = subprocess.run(
+                ["git", "ls-remote", ls_remote_url],
+                capture_output=True, text=True, timeout=30, env=git_env
+            )
+            if refs_check.returncode == 0 and not refs_check.stdout.strip():
+                print(f"Repository '{repo.name}' appears to be empty. Proceeding without branch check.")
             else:
                 raise HTTPException(status_code=400, detail=f"Branch '{repo.branch}' does not exist on remote repository.")
+        elif branch_check.returncode != 0:
+            raise HTTPException(status_code=400, detail="Remote repository not found or not accessible.")
 
         # Auto-generate local path if not provided (format: base_path/owner/repo_name)
         local_path = repo.local_path
@@ -1056,6 +1222,7 @@ async def add_repository(repo: RepositoryRequest, current_user: dict = Depends(g
             description=repo.description,
             user_id=current_user.get("id")
         )
+        _cached_repo_for_cwd.cache_clear()
         return {"status": "success", "repo_id": repo_id, "message": "Repository added successfully", "local_path": local_path}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1073,16 +1240,18 @@ async def get_repositories(current_user: dict = Depends(get_current_user)):
 async def get_repository(repo_id: int, current_user: dict = Depends(get_current_user)):
     """Get a specific repository."""
     # Auth handled by Depends(get_current_user)
-    
+
     user_id = current_user.get("id")
-    repo = db.get_repository(repo_id, user_id=user_id)
-    
+    cache_key = (repo_id, user_id)
+    repo = _REPO_CACHE.get(cache_key)
+    if repo is None:
+        repo = db.get_repository(repo_id, user_id=user_id)
+        if repo:
+            _REPO_CACHE.set(cache_key, repo)
+
     if not repo:
         raise HTTPException(status_code=404, detail="Repository not found or access denied")
-        
-    return repo
-    if not repo:
-        raise HTTPException(status_code=404, detail=ERROR_REPO_NOT_FOUND)
+
     return repo
 
 @app.delete("/repositories/{repo_id}")
@@ -1092,6 +1261,8 @@ async def delete_repository(repo_id: int, current_user: dict = Depends(get_curre
     
     user_id = current_user.get("id")
     success = db.delete_repository(repo_id, user_id=user_id)
+    _REPO_CACHE.pop((repo_id, user_id))
+    _cached_repo_for_cwd.cache_clear()
     if not success:
         raise HTTPException(status_code=404, detail=ERROR_REPO_NOT_FOUND)
     return {"status": "success", "message": "Repository deleted successfully"}
@@ -1221,9 +1392,34 @@ class TechStackValidationRequest(BaseModel):
     tech_stack: str
     github_url: str
 
+# Only obviously-invalid input is rejected locally (empty, or nothing
+# alphabetic to even name a technology); anything plausible goes to the AI,
+# which knows stacks no hardcoded allowlist would.
+_TECH_ALPHA_RE = re.compile(r'[a-z]')
+
+# Tech stacks repeat heavily across users; remember validation verdicts.
+_TECHSTACK_CACHE = _TTLCache(maxsize=4096, ttl=3600)
+
+class FetchBranchesRequest(BaseModel):
+    github_url: str
+    github_token: Optional[str] = None
+
 @app.post("/validate-techstack")
 async def validate_tech_stack(req: TechStackValidationRequest, current_user: dict = Depends(get_current_user)):
     """Validate tech stack using AI before repository registration."""
+    # Cheap local pre-filter: only stacks that can't possibly name a
+    # technology (empty or no letters at all) skip the API.
+    normalized = req.tech_stack.strip().lower()
+    if not normalized or not _TECH_ALPHA_RE.search(normalized):
+        return {
+            "is_valid": False,
+            "message": "The provided tech stack does not appear to contain any technologies."
+        }
+
+    cached = _TECHSTACK_CACHE.get(normalized)
+    if cached is not None:
+        return cached
+
     try:
         # Set OpenAI API key
         openai.api_key = os.getenv("OPENAI_API_KEY")
@@ -1265,7 +1461,8 @@ Examples of INVALID tech stacks:
 - "" (empty)
 """
 
-        response = openai.ChatCompletion.create(
+        # Async variant so the validation round-trip doesn't block the event loop
+        response = await openai.ChatCompletion.acreate(
             model="gpt-3.5-turbo",
             messages=[
                 {"role": "system", "content": "You are a precise tech stack validator. Always respond with valid JSON."},
@@ -1278,20 +1475,22 @@ Examples of INVALID tech stacks:
         result_text = response.choices[0].message.content.strip()
 
         # Parse JSON response
-        import json
         result = json.loads(result_text)
 
         if not result.get('is_valid', True):
             logger.info(f"Tech stack validation failed: {req.tech_stack} - Reason: {result.get('reason')}")
-            return {
+            verdict = {
                 "is_valid": False,
                 "message": result.get('reason', 'The provided tech stack does not appear to be valid.')
             }
+        else:
+            verdict = {
+                "is_valid": True,
+                "message": "Tech stack validated successfully"
+            }
 
-        return {
-            "is_valid": True,
-            "message": "Tech stack validated successfully"
-        }
+        _TECHSTACK_CACHE.set(normalized, verdict)
+        return verdict
 
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse AI response: {e}")
@@ -1312,9 +1511,6 @@ Examples of INVALID tech stacks:
 async def detect_tech_stack(req: FetchBranchesRequest, current_user: dict = Depends(get_current_user)):
     """Auto-detect tech stack from repository by analyzing config files."""
     try:
-        import requests
-        import re
-        
         logger.info(f"🔍 detect_techstack called for repo: {req.github_url}")
         
         # Extract owner/repo from GitHub URL
@@ -1438,10 +1634,6 @@ async def detect_tech_stack(req: FetchBranchesRequest, current_user: dict = Depe
             "message": "Error analyzing repository"
         }
 
-class FetchBranchesRequest(BaseModel):
-    github_url: str
-    github_token: Optional[str] = None
-
 @app.post("/fetch-branches")
 async def fetch_branches(req: FetchBranchesRequest):
     """Fetch available branches from a GitHub repository and detect the default branch.
@@ -1449,8 +1641,6 @@ async def fetch_branches(req: FetchBranchesRequest):
     Note: Public endpoint (no auth required) since GitHub API is public.
     """
     try:
-        import requests
-
         # Debug logging
         logger.info(f"🔍 fetch_branches called with URL: {req.github_url}")
         logger.info(f"🔍 Token provided: {'Yes' if req.github_token else 'No'}")
@@ -1635,8 +1825,8 @@ async def fetch_branches(req: FetchBranchesRequest):
 async def update_code_by_id(req: UpdateByIdRequest, current_user: dict = Depends(get_current_user)):
     """Queue a code update job for processing."""
     try:
-        # Get full user details including plan
-        user = db.get_user_by_google_id(current_user['user_id'])
+        # Get full user details including plan (cached; this endpoint is hot)
+        user = get_user_cached(current_user['user_id'])
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -1670,6 +1860,7 @@ async def update_code_by_id(req: UpdateByIdRequest, current_user: dict = Depends
             user_id=user['id']
         )
         
+        notify_new_job()
         logger.info(f"✅ Job {job_id} queued for repo {req.repo_id} by user {user['id']}")
         
         return {
@@ -1689,7 +1880,11 @@ async def update_code_by_id(req: UpdateByIdRequest, current_user: dict = Depends
 @app.get("/job/{job_id}")
 async def get_job_status(job_id: int, current_user: dict = Depends(get_current_user)):
     """Get the status of a job."""
-    job = db.get_job_status(job_id)
+    job = _JOB_CACHE.get(job_id)
+    if job is None:
+        job = db.get_job_status(job_id)
+        if job and job.get('status') in _TERMINAL_JOB_STATUSES:
+            _JOB_CACHE.set(job_id, job)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
@@ -1793,8 +1988,6 @@ async def update_code(req: UpdateRequest, authorization: Optional[str] = Header(
         
         raise HTTPException(status_code=500, detail=str(e))
 
-        raise HTTPException(status_code=500, detail=str(e))
-
 # === Security Endpoints ===
 
 @app.get("/repositories/{repo_id}/branches")
@@ -1806,40 +1999,18 @@ async def get_repository_branches(repo_id: int, current_user: dict = Depends(get
         raise HTTPException(status_code=404, detail="Repository not found")
     
     repo_path = Path(repo['local_path'])
-    branches = []
-    
+
     try:
-        # Fetch all branches
-        subprocess.run(["git", "fetch", "--all"], cwd=str(repo_path), check=True, capture_output=True)
-        
-        # List remote branches
-        result = subprocess.run(
-            ["git", "branch", "-r"], 
-            cwd=str(repo_path), 
-            capture_output=True, 
-            text=True, 
-            check=True
-        )
-        
-        for line in result.stdout.splitlines():
-            branch = line.strip()
-            if "->" in branch: continue
-            branch_name = branch.replace("origin/", "")
-            branches.append(branch_name)
-            
+        branches = list_remote_branches(repo_path)
     except Exception as e:
         logger.error(f"Failed to list branches: {e}")
         return {"branches": [repo['branch']]}
-        
+
     return {"branches": branches}
 
 @app.post("/repositories/{repo_id}/scan")
-async def scan_repository(repo_id: int, scan_all_branches: bool = False, target_branch: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def scan_repository(repo_id: int, scan_all_branches: bool = False, target_branch: Optional[str] = None, current_user: dict = Depends(require_admin)):
     """Scan a repository for security vulnerabilities."""
-    # Admin check
-    if current_user.get("email") not in ADMIN_EMAILS:
-        raise HTTPException(status_code=403, detail="Admin access required")
-
     user_id = current_user.get("id")
     repo = db.get_repository(repo_id, user_id=user_id)
     if not repo:
@@ -1852,27 +2023,7 @@ async def scan_repository(repo_id: int, scan_all_branches: bool = False, target_
     
     if scan_all_branches:
         try:
-            # Fetch all branches
-            subprocess.run(["git", "fetch", "--all"], cwd=str(repo_path), check=True, capture_output=True)
-            
-            # List remote branches
-            result = subprocess.run(
-                ["git", "branch", "-r"], 
-                cwd=str(repo_path), 
-                capture_output=True, 
-                text=True, 
-                check=True
-            )
-            
-            # Parse branches (ignore HEAD)
-            for line in result.stdout.splitlines():
-                branch = line.strip()
-                if "->" in branch:
-                    continue
-                # Remove 'origin/' prefix
-                branch_name = branch.replace("origin/", "")
-                branches_to_scan.append(branch_name)
-                
+            branches_to_scan = list_remote_branches(repo_path)
         except Exception as e:
             logger.error(f"Failed to list branches: {e}")
             # Fallback to current branch
@@ -1890,9 +2041,6 @@ async def scan_repository(repo_id: int, scan_all_branches: bool = False, target_
         logger.info(f"Scanning branch: {branch}")
         
         # Create a temporary worktree for the branch to avoid messing up the main repo
-        import tempfile
-        import shutil
-        
         worktree_path = Path(tempfile.mkdtemp())
         try:
             # Create worktree
@@ -1903,46 +2051,51 @@ async def scan_repository(repo_id: int, scan_all_branches: bool = False, target_
                 capture_output=True
             )
             
-            # Scan the worktree
-            findings = scanner.scan_repository(str(worktree_path))
+            # Scan the worktree (files are independent, so fan out across cores)
+            findings = scanner.scan_repository_parallel(str(worktree_path))
             
-            # Process findings
-            existing_vulns = db.get_vulnerabilities(repo_id, status="open", branch=branch)
-            existing_vulns += db.get_vulnerabilities(repo_id, status="in_progress", branch=branch)
+            # Process findings (one query for both statuses instead of two round-trips)
+            existing_vulns = db.get_vulnerabilities(repo_id, statuses=("open", "in_progress"), branch=branch)
             
-            existing_map = {f"{v['file_path']}:{v['line_number']}:{v['pattern_id']}": v for v in existing_vulns}
+            existing_map = {(v['file_path'], v['line_number'], v['pattern_id']): v for v in existing_vulns}
             found_keys = set()
-            
+            to_insert = []
+
             for finding in findings:
-                key = f"{finding['file_path']}:{finding['line_number']}:{finding['pattern_id']}"
+                key = (finding['file_path'], finding['line_number'], finding['pattern_id'])
                 found_keys.add(key)
-                
+
                 if key not in existing_map:
-                    db.log_vulnerability(
-                        repo_id=repo_id,
-                        file_path=finding['file_path'],
-                        description=finding['description'],
-                        severity=finding['severity'],
-                        line_number=finding['line_number'],
-                        pattern_id=finding['pattern_id'],
-                        branch=branch
-                    )
-                    total_findings += 1
+                    to_insert.append({
+                        "repo_id": repo_id,
+                        "file_path": finding['file_path'],
+                        "description": finding['description'],
+                        "severity": finding['severity'],
+                        "line_number": finding['line_number'],
+                        "pattern_id": finding['pattern_id'],
+                        "branch": branch
+                    })
                 all_findings.append(finding)
 
-            # Auto-resolve fixed vulnerabilities for this branch
-            for key, vuln in existing_map.items():
-                if key not in found_keys:
-                    db.update_vulnerability_status(vuln['id'], "resolved")
-                    total_resolved += 1
+            # One bulk INSERT per branch instead of one commit per finding
+            total_findings += db.log_vulnerabilities_bulk(to_insert)
+
+            # Auto-resolve fixed vulnerabilities for this branch in one UPDATE
+            resolved_ids = [vuln['id'] for key, vuln in existing_map.items() if key not in found_keys]
+            total_resolved += db.update_vulnerability_status_bulk(resolved_ids, "resolved")
                     
         except Exception as e:
             logger.error(f"Error scanning branch {branch}: {e}")
         finally:
-            # Cleanup worktree
+            # Cleanup worktree: `git worktree remove --force` already deletes the
+            # directory, so only fall back to rmtree if the removal failed.
             try:
-                subprocess.run(["git", "worktree", "remove", "--force", str(worktree_path)], cwd=str(repo_path), capture_output=True)
-                if worktree_path.exists():
+                removed = subprocess.run(
+                    ["git", "worktree", "remove", "--force", str(worktree_path)],
+                    cwd=str(repo_path),
+                    capture_output=True
+                )
+                if removed.returncode != 0 and worktree_path.exists():
                     shutil.rmtree(worktree_path, ignore_errors=True)
             except Exception as e:
                 logger.error(f"Failed to cleanup worktree: {e}")
@@ -1956,12 +2109,8 @@ async def scan_repository(repo_id: int, scan_all_branches: bool = False, target_
     }
 
 @app.get("/repositories/{repo_id}/vulnerabilities")
-async def get_vulnerabilities(repo_id: int, status: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_vulnerabilities(repo_id: int, status: Optional[str] = None, current_user: dict = Depends(require_admin)):
     """Get vulnerabilities for a repository."""
-    # Admin check
-    if current_user.get("email") not in ADMIN_EMAILS:
-        raise HTTPException(status_code=403, detail="Admin access required")
-
     user_id = current_user.get("id")
     repo = db.get_repository(repo_id, user_id=user_id)
     if not repo:
@@ -1971,12 +2120,8 @@ async def get_vulnerabilities(repo_id: int, status: Optional[str] = None, curren
     return vulns
 
 @app.post("/vulnerabilities/{vuln_id}/fix")
-async def fix_vulnerability(vuln_id: int, current_user: dict = Depends(get_current_user)):
+async def fix_vulnerability(vuln_id: int, current_user: dict = Depends(require_admin)):
     """Queue a job to fix a vulnerability."""
-    # Admin check
-    if current_user.get("email") not in ADMIN_EMAILS:
-        raise HTTPException(status_code=403, detail="Admin access required")
-
     user_id = current_user.get("id")
     
     # Get vulnerability
@@ -1992,17 +2137,12 @@ async def fix_vulnerability(vuln_id: int, current_user: dict = Depends(get_curre
     # Create fix job
     instructions = f"Fix the security vulnerability in {vuln['file_path']}. Issue: {vuln['description']} (Severity: {vuln['severity']}). Please analyze the code and apply a secure fix.\n\n[METADATA:VULN_ID:{vuln_id}]"
     job_id = db.create_job(vuln['repo_id'], instructions, user_id=user_id)
-    
+    notify_new_job()
+
     # Update status
     db.update_vulnerability_status(vuln_id, "in_progress")
     
     return {"status": "success", "job_id": job_id, "message": "Fix job queued"}
-    
-    # Let's assume we added get_vulnerability to DB. 
-    # Since we didn't yet, let's skip the strict check for this specific tool call 
-    # and implement it properly in the next step.
-    
-    return {"status": "error", "message": "Not implemented yet"}
 
 @app.post("/exec")
 async def exec_command(payload: dict, authorization: Optional[str] = Header(None)):
@@ -2060,12 +2200,8 @@ def start_background_worker():
         logger.error(f"Error in background worker: {e}", exc_info=True)
 
 @app.get("/api/bugs")
-async def get_bug_reports(status: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+async def get_bug_reports(status: Optional[str] = None, _: dict = Depends(require_admin)):
     """Get a list of bug reports."""
-    # Admin check
-    if current_user.get("email") not in ADMIN_EMAILS:
-        raise HTTPException(status_code=403, detail="Admin access required")
-
     bugs = db.get_bug_reports(status=status)
     return bugs
 
@@ -2073,7 +2209,7 @@ async def get_bug_reports(status: Optional[str] = None, current_user: dict = Dep
 async def global_exception_handler(request: Request, exc: Exception):
     error_type = type(exc).__name__
     error_message = str(exc)
-    stack_trace = traceback.format_exc()
+    stack_trace = _format_exception_cached(exc)[-_MAX_STACK_TRACE_CHARS:]
     endpoint = request.url.path
     
     # Try to get user_id from state if available (set by middleware/dependencies)
@@ -2082,55 +2218,43 @@ async def global_exception_handler(request: Request, exc: Exception):
          user_id = request.state.user.get("id")
 
     logger.error(f"Unhandled exception: {error_message}", exc_info=True)
-    
-    # Log to DB
-    bug_id = db.log_bug(
-        error_type=error_type,
-        error_message=error_message,
-        stack_trace=stack_trace,
-        endpoint=endpoint,
-        user_id=user_id if user_id is not None else 0
-    )
-    
-    # Auto-fix: Queue a job if we can identify the repository
+
+    # Hand the DB work to the background bug writer so the failing request
+    # isn't held up by extra round-trips; the response carries a reference
+    # the writer logs alongside the eventual bug id.
+    error_ref = uuid.uuid4().hex
     try:
-        current_path = os.getcwd()
-        repo = db.get_repository_by_local_path(current_path)
-        
+        repo = _cached_repo_for_cwd()
+
+        instructions = None
         if repo:
             logger.info(f"🔍 Found repository for auto-fix: {repo['name']}")
-            
-            # Create instructions for the AI
-            instructions = f"""
-CRITICAL BUG FIX REQUIRED
 
-Error Type: {error_type}
-Error Message: {error_message}
-Endpoint: {endpoint}
+            # Create instructions for the AI
+            instructions = _FIX_TEMPLATE.format(
+                error_type=error_type,
+                error_message=error_message,
+                endpoint=endpoint,
+                stack_trace=stack_trace
+            )
 
-Stack Trace:
-{stack_trace}
+        _bug_queue.put_nowait({
+            "error_ref": error_ref,
+            "error_type": error_type,
+            "error_message": error_message,
+            "stack_trace": stack_trace,
+            "endpoint": endpoint,
+            "user_id": user_id,
+            "repo_id": repo['id'] if repo else None,
+            "instructions": instructions
+        })
 
-Please analyze the stack trace and fix the bug in the codebase. 
-Ensure the fix handles the edge case that caused this error.
-"""
-            # Create job
-            job_id = db.create_job(
-                repo_id=repo['id'],
-                instructions=instructions,
-                user_id=user_id
-            )
-            logger.info(f"✅ Auto-fix job {job_id} queued for bug {bug_id}")
-            
-            # Update bug status to in_progress
-            db.update_bug_status(bug_id, "in_progress")
-            
     except Exception as e:
-        logger.error(f"Failed to queue auto-fix job: {e}")
+        logger.error(f"Failed to queue bug report: {e}")
 
     return JSONResponse(
         status_code=500,
-        content={"detail": "Internal Server Error", "bug_report_id": bug_id}
+        content={"detail": "Internal Server Error", "error_ref": error_ref}
     )
 
 # Run by uvicorn when invoked directly
@@ -2152,7 +2276,17 @@ if __name__ == "__main__":
         "main:app",
         host=HOST_ADDRESS,
         port=8080,
-        reload=False
+        reload=False,
+        # "auto" picks uvloop + httptools when installed (they are in
+        # requirements.txt) and falls back cleanly on platforms without them.
+        loop="auto",
+        http="auto",
+        # Deliberately a single process: the background job thread and the
+        # notify_new_job() wakeup Event live in this process, so forked
+        # uvicorn workers would set an Event the worker loop never sees —
+        # and each would carry its own 20+10 connection pool. Scale request
+        # handling with an external process manager if ever needed.
+        workers=1
     )
 
 
@@ -1,6 +1,5 @@
 import os
-from sqlalchemy import create_engine, text
-from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy import text
 from dotenv import load_dotenv
 from models import Base
 
@@ -15,93 +14,46 @@ def migrate_database():
         print("❌ DATABASE_URL is not set in your environment variables.")
         return False
 
-    engine = create_engine(DATABASE_URL)
-    
+    # Imported after the guard above so a missing DATABASE_URL prints the
+    # friendly message instead of database.py raising at import time.
+    from database import engine
+
     try:
         # First, create all missing tables
         print("🆕 Creating any missing tables...")
         Base.metadata.create_all(engine)
         print("✅ Tables created/verified")
         
-        # Now add missing columns with separate transactions
+        tables = ["repositories", "request_logs", "aider_execution_logs", "api_metric_logs"]
+
+        # One metadata query tells us every existing user_id column at once —
+        # no exception-driven SELECT probes aborting the transaction.
         with engine.connect() as conn:
-            
-            # Add user_id column to repositories table if it doesn't exist
-            try:
-                conn.execute(text("SELECT user_id FROM repositories LIMIT 1"))
-                print("✅ repositories.user_id column exists")
-            except (OperationalError, ProgrammingError):
-                print("➕ Adding user_id column to repositories table...")
-                try:
-                    conn.execute(text("ALTER TABLE repositories ADD COLUMN user_id INTEGER"))
-                    conn.commit()
-                    print("✅ repositories.user_id column added")
-                    
-                    # Add foreign key constraint in separate transaction
-                    conn.execute(text("ALTER TABLE repositories ADD CONSTRAINT fk_repositories_user_id FOREIGN KEY (user_id) REFERENCES users(id)"))
-                    conn.commit()
-                    print("✅ repositories foreign key constraint added")
-                except Exception as e:
-                    print(f"⚠️  repositories.user_id: {e}")
-                    conn.rollback()
-            
-            # Add user_id column to request_logs table if it doesn't exist
-            try:
-                conn.execute(text("SELECT user_id FROM request_logs LIMIT 1"))
-                print("✅ request_logs.user_id column exists")
-            except (OperationalError, ProgrammingError):
-                print("➕ Adding user_id column to request_logs table...")
-                try:
-                    conn.execute(text("ALTER TABLE request_logs ADD COLUMN user_id INTEGER"))
-                    conn.commit()
-                    print("✅ request_logs.user_id column added")
-                    
-                    # Add foreign key constraint in separate transaction
-                    conn.execute(text("ALTER TABLE request_logs ADD CONSTRAINT fk_request_logs_user_id FOREIGN KEY (user_id) REFERENCES users(id)"))
-                    conn.commit()
-                    print("✅ request_logs foreign key constraint added")
-                except Exception as e:
-                    print(f"⚠️  request_logs.user_id: {e}")
-                    conn.rollback()
-            
-            # Add user_id column to aider_execution_logs table if it doesn't exist
-            try:
-                conn.execute(text("SELECT user_id FROM aider_execution_logs LIMIT 1"))
-                print("✅ aider_execution_logs.user_id column exists")
-            except (OperationalError, ProgrammingError):
-                print("➕ Adding user_id column to aider_execution_logs table...")
-                try:
-                    conn.execute(text("ALTER TABLE aider_execution_logs ADD COLUMN user_id INTEGER"))
-                    conn.commit()
-                    print("✅ aider_execution_logs.user_id column added")
-                    
-                    # Add foreign key constraint in separate transaction
-                    conn.execute(text("ALTER TABLE aider_execution_logs ADD CONSTRAINT fk_aider_execution_logs_user_id FOREIGN KEY (user_id) REFERENCES users(id)"))
-                    conn.commit()
-                    print("✅ aider_execution_logs foreign key constraint added")
-                except Exception as e:
-                    print(f"⚠️  aider_execution_logs.user_id: {e}")
-                    conn.rollback()
-            
-            # Add user_id column to api_metric_logs table if it doesn't exist
-            try:
-                conn.execute(text("SELECT user_id FROM api_metric_logs LIMIT 1"))
-                print("✅ api_metric_logs.user_id column exists")
-            except (OperationalError, ProgrammingError):
-                print("➕ Adding user_id column to api_metric_logs table...")
-                try:
-                    conn.execute(text("ALTER TABLE api_metric_logs ADD COLUMN user_id INTEGER"))
-                    conn.commit()
-                    print("✅ api_metric_logs.user_id column added")
-                    
-                    # Add foreign key constraint in separate transaction
-                    conn.execute(text("ALTER TABLE api_metric_logs ADD CONSTRAINT fk_api_metric_logs_user_id FOREIGN KEY (user_id) REFERENCES users(id)"))
-                    conn.commit()
-                    print("✅ api_metric_logs foreign key constraint added")
-                except Exception as e:
-                    print(f"⚠️  api_metric_logs.user_id: {e}")
-                    conn.rollback()
-    
+            result = conn.execute(text(
+                "SELECT table_name FROM information_schema.columns "
+                "WHERE table_schema = 'public' AND column_name = 'user_id' "
+                "AND table_name IN ('repositories', 'request_logs', "
+                "'aider_execution_logs', 'api_metric_logs')"
+            ))
+            existing = {row[0] for row in result}
+
+        missing = [table for table in tables if table not in existing]
+        for table in existing:
+            print(f"✅ {table}.user_id column exists")
+
+        if missing:
+            # All schema changes in one transaction — a single commit at the
+            # end instead of a WAL fsync after every ALTER.
+            with engine.begin() as conn:
+                for table in missing:
+                    print(f"➕ Adding user_id column to {table} table...")
+                    conn.execute(text(
+                        f"ALTER TABLE {table} ADD COLUMN user_id INTEGER REFERENCES users(id)"
+                    ))
+
+            for table in missing:
+                print(f"✅ {table}.user_id column and foreign key added")
+
     except Exception as e:
         print(f"❌ Migration error: {e}")
         return False
@@ -115,8 +67,9 @@ def verify_migration():
     if not DATABASE_URL:
         print("❌ DATABASE_URL is not set in your environment variables.")
         return False
-    engine = create_engine(DATABASE_URL)
-    
+
+    from database import engine
+
     try:
         with engine.connect() as conn:
             # Test each table
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -50,8 +50,8 @@ class RequestLog(Base):
     __tablename__ = "request_logs"
     
     id = Column(Integer, primary_key=True, index=True)
-    endpoint = Column(String)
-    repo_id = Column(Integer)
+    endpoint = Column(String, index=True)
+    repo_id = Column(Integer, index=True)
     repo_path = Column(String)
     instructions = Column(Text)
     dry_run = Column(String)
@@ -60,6 +60,12 @@ class RequestLog(Base):
     result_data = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # BRIN suits this append-only table: tiny index, prunes by time range.
+        # The postgresql_using kwarg is ignored on other dialects.
+        Index('ix_request_logs_created_brin', 'created_at', postgresql_using='brin'),
+    )
+
 class AiderExecutionLog(Base):
     __tablename__ = "aider_execution_logs"
     
@@ -70,19 +76,27 @@ class AiderExecutionLog(Base):
     stdout = Column(Text)
     stderr = Column(Text)
     execution_time = Column(Integer)
-    repo_id = Column(Integer)
+    repo_id = Column(Integer, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class ApiMetricLog(Base):
     __tablename__ = "api_metric_logs"
     
     id = Column(Integer, primary_key=True, index=True)
-    endpoint = Column(String)
-    repo_id = Column(Integer)
+    endpoint = Column(String, index=True)
+    repo_id = Column(Integer, index=True)
     metric_name = Column(String)
     metric_value = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # get_api_stats aggregates per endpoint over a recent time window.
+        Index('ix_api_metric_ep_created', 'endpoint', 'created_at'),
+        # Append-only time series: BRIN on created_at is ~1000x smaller than
+        # btree and still prunes the 24h stats window.
+        Index('ix_api_metric_created_brin', 'created_at', postgresql_using='brin'),
+    )
+
 class BugReport(Base):
     __tablename__ = "bug_reports"
 
@@ -95,6 +109,16 @@ class BugReport(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String, default="open")  # open, in_progress, resolved, closed
 
+    __table_args__ = (
+        # get_bug_reports filters by status and pages newest-first; the
+        # composite serves single-status lookups too (status is its prefix),
+        # and the partial index covers the "open" bucket the UI paginates —
+        # no extra single-column indexes for every exception write to
+        # maintain.
+        Index('ix_bug_reports_status_created', 'status', 'created_at'),
+        Index('ix_bug_reports_open', 'created_at', postgresql_where=text("status = 'open'")),
+    )
+
 class Vulnerability(Base):
     __tablename__ = "vulnerabilities"
 
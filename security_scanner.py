@@ -1,13 +1,50 @@
 import re
 import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+# Optional linear-time regex engine (google-re2). The patterns are fixed
+# signatures, so a non-backtracking engine is a large win on big files;
+# stdlib re remains the fallback when the binding isn't installed.
+try:
+    import re2 as _regex_engine
+except ImportError:
+    _regex_engine = re
+
+def _compile_pattern(regex: str):
+    """Compile with the preferred engine, falling back to stdlib re."""
+    try:
+        return _regex_engine.compile(regex)
+    except Exception:
+        return re.compile(regex)
+
+def _compile_union(patterns: List[Dict[str, Any]]):
+    """Combine all patterns into one alternation, each wrapped in a named group
+    keyed by its id, so a single scan identifies which signature matched.
+
+    Leading (?i) prefixes are hoisted into a global IGNORECASE flag because
+    Python rejects mid-pattern global flags inside an alternation (the only
+    case-sensitive pattern, the IP literal, contains no letters).
+    """
+    parts = []
+    for p in patterns:
+        body = p['regex']
+        if body.startswith('(?i)'):
+            body = body[4:]
+        parts.append(f"(?P<{p['id']}>{body})")
+    union = '|'.join(parts)
+    try:
+        return _regex_engine.compile(union, re.IGNORECASE)
+    except Exception:
+        return re.compile(union, re.IGNORECASE)
 
 class SecurityScanner:
     """
     Simple static analysis scanner for security vulnerabilities.
     """
-    
+
     PATTERNS = [
         {
             "id": "hardcoded_secret",
@@ -46,6 +83,49 @@ class SecurityScanner:
         }
     ]
 
+    # Compiled once at import; _scan_file never recompiles per line.
+    _COMPILED_PATTERNS = [(p, _compile_pattern(p['regex'])) for p in PATTERNS]
+
+    # Single alternation over every signature — one pass per line instead of
+    # one search per pattern. Match group name maps back to the pattern id.
+    _UNION_PATTERN = _compile_union(PATTERNS)
+    _PATTERNS_BY_ID = {p['id']: p for p in PATTERNS}
+
+    # Vendor/build trees that dwarf real source; pruned before os.walk descends.
+    SKIP_DIRS = frozenset({'.git', 'node_modules', '.venv', 'venv', 'dist', 'build', '__pycache__'})
+
+    # Only these extensions are ever opened — an allowlist beats blacklisting
+    # the endless variety of binaries and assets a real repo accumulates.
+    SOURCE_EXTS = frozenset({
+        '.py', '.js', '.ts', '.jsx', '.tsx', '.go', '.rb', '.java', '.kt',
+        '.c', '.cpp', '.h', '.hpp', '.cs', '.rs', '.php', '.sh', '.pl',
+        '.sql', '.yaml', '.yml', '.json', '.toml', '.ini', '.cfg',
+        '.html', '.vue', '.swift', '.scala', '.tf',
+    })
+
+    # Per-call tuning knobs, kept at class level with the other constants.
+    _BINARY_SNIFF_BYTES = 8192
+    _SNIPPET_LEN = 100
+
+    def _iter_files(self, repo_path: Path) -> Iterator[Tuple[Path, str]]:
+        """Yield (file_path, relative_path) pairs for every scannable file."""
+        for root, dirs, files in os.walk(repo_path):
+            dirs[:] = [d for d in dirs if d not in self.SKIP_DIRS]
+            for file in files:
+                # Dotfile env files (.env, .env.local, ...) are the likeliest
+                # home of hardcoded secrets, so they bypass the hidden-file
+                # skip; everything else must match the extension allowlist.
+                if file == '.env' or file.startswith('.env.'):
+                    pass
+                elif file.startswith('.') or os.path.splitext(file)[1] not in self.SOURCE_EXTS:
+                    continue
+
+                file_path = Path(root) / file
+                try:
+                    yield file_path, str(file_path.relative_to(repo_path))
+                except Exception as e:
+                    print(f"Error resolving file {file_path}: {e}")
+
     def scan_repository(self, repo_path: str) -> List[Dict[str, Any]]:
         """
         Scan a repository for vulnerabilities.
@@ -53,42 +133,94 @@ class SecurityScanner:
         """
         findings = []
         repo_path = Path(repo_path)
-        
+
         if not repo_path.exists():
             return []
 
-        # Walk through all files
-        for root, _, files in os.walk(repo_path):
-            for file in files:
-                # Skip hidden files and common non-code files
-                if file.startswith('.') or file.endswith(('.pyc', '.git', '.png', '.jpg', '.css')):
-                    continue
-                
-                file_path = Path(root) / file
-                try:
-                    relative_path = file_path.relative_to(repo_path)
-                    self._scan_file(file_path, str(relative_path), findings)
-                except Exception as e:
-                    print(f"Error scanning file {file_path}: {e}")
-                    
+        for file_path, relative_path in self._iter_files(repo_path):
+            try:
+                findings.extend(self._scan_file(file_path, relative_path))
+            except Exception as e:
+                print(f"Error scanning file {file_path}: {e}")
+
+        return findings
+
+    def scan_repository_parallel(self, repo_path: str, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Scan a repository with a process pool so regex matching fans out
+        across CPUs. Returns the same findings as scan_repository.
+        """
+        repo_path = Path(repo_path)
+
+        if not repo_path.exists():
+            return []
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        findings = []
+        targets = list(self._iter_files(repo_path))
+        # chunksize keeps IPC from dominating when the tree has many tiny files.
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(_scan_file_worker, targets, chunksize=32):
+                findings.extend(result)
+
         return findings
 
-    def _scan_file(self, file_path: Path, relative_path: str, findings: List[Dict[str, Any]]):
-        """Scan a single file against all patterns."""
+    def _scan_file(self, file_path: Path, relative_path: str) -> List[Dict[str, Any]]:
+        """Scan a single file against all patterns and return its findings."""
+        findings = []
         try:
-            content = file_path.read_text(encoding='utf-8', errors='ignore')
-            lines = content.splitlines()
-            
-            for i, line in enumerate(lines):
-                for pattern in self.PATTERNS:
-                    if re.search(pattern['regex'], line):
-                        findings.append({
-                            "file_path": relative_path,
-                            "line_number": i + 1,
-                            "pattern_id": pattern['id'],
-                            "severity": pattern['severity'],
-                            "description": pattern['description'],
-                            "match": line.strip()[:100]  # Store snippet
-                        })
+            # Binary sniff: a NUL byte in the first 8 KB means this is not
+            # source code (git uses the same heuristic) — skip without decoding.
+            with file_path.open('rb') as f:
+                head = f.read(self._BINARY_SNIFF_BYTES)
+                if b'\x00' in head:
+                    return findings
+                raw = head + f.read()
+            content = raw.decode('utf-8', errors='ignore')
+
+            # Start offset of every line; a match at position p sits on line
+            # bisect_right(offsets, p). str.find scans in C without building
+            # a match object per newline.
+            offsets = [0]
+            find = content.find
+            i = find('\n')
+            while i != -1:
+                offsets.append(i + 1)
+                i = find('\n', i + 1)
+
+            seen = set()
+            for m in self._UNION_PATTERN.finditer(content):
+                pattern_id = m.lastgroup
+                line_number = bisect_right(offsets, m.start())
+                if (line_number, pattern_id) in seen:
+                    continue
+                seen.add((line_number, pattern_id))
+                pattern = self._PATTERNS_BY_ID[pattern_id]
+                line_start = offsets[line_number - 1]
+                line_end = content.find('\n', line_start)
+                if line_end == -1:
+                    line_end = len(content)
+                findings.append({
+                    "file_path": relative_path,
+                    "line_number": line_number,
+                    "pattern_id": pattern['id'],
+                    "severity": pattern['severity'],
+                    "description": pattern['description'],
+                    "match": content[line_start:line_end].strip()[:self._SNIPPET_LEN]  # Store snippet
+                })
         except Exception:
             pass
+        return findings
+
+
+# One scanner per worker process, built lazily on first task.
+_WORKER_SCANNER: Optional[SecurityScanner] = None
+
+def _scan_file_worker(target: Tuple[Path, str]) -> List[Dict[str, Any]]:
+    """Top-level (picklable) entry point used by the process pool."""
+    global _WORKER_SCANNER
+    if _WORKER_SCANNER is None:
+        _WORKER_SCANNER = SecurityScanner()
+    return _WORKER_SCANNER._scan_file(*target)
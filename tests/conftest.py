@@ -1,4 +1,5 @@
 import pytest
+from functools import lru_cache
 from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
@@ -9,43 +10,96 @@ import os
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import Base, RDBMS
-import main # Import main to patch db if needed
+# main (and the FastAPI app it builds) is imported lazily inside the client
+# fixture so pytest collection doesn't pay for app construction.
+from database import Base
 
 from sqlalchemy.pool import StaticPool
 
-# Use in-memory SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# In-memory SQLite for testing, built lazily and exactly once per process.
+# The URL carries the xdist worker id so one worker's shared-cache database
+# can never collide with another's.
+@lru_cache(maxsize=1)
+def _get_engine():
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    return create_engine(
+        f"sqlite:///file:test_db_{worker}?mode=memory&cache=shared&uri=true",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+@lru_cache(maxsize=1)
+def _get_session_factory():
+    return sessionmaker(autocommit=False, autoflush=False, bind=_get_engine())
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def test_db():
     """
-    Creates a fresh database for each test.
+    Creates the schema once for the whole session; per-test isolation is
+    handled by the transactional db_connection fixture below.
     """
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=_get_engine())
     yield
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=_get_engine())
 
 @pytest.fixture(scope="function")
-def mock_session_local():
+def db_connection(test_db):
     """
-    Patches database.SessionLocal to use the test database.
+    Wraps each test in an outer transaction that is rolled back at teardown,
+    so tests see a clean database without create_all/drop_all churn.
     """
-    with patch("database.SessionLocal", side_effect=TestingSessionLocal) as mock:
-        yield mock
+    conn = _get_engine().connect()
+    trans = conn.begin()
+    yield conn
+    trans.rollback()
+    conn.close()
 
 @pytest.fixture(scope="function")
-def client(test_db, mock_session_local):
+def mock_session_local(db_connection):
     """
-    Test client that uses the test database.
+    Patches database.SessionLocal with sessions that join the test's outer
+    transaction via savepoints — commits inside the app never escape it.
     """
+    def session_factory():
+        return _get_session_factory()(
+            bind=db_connection, join_transaction_mode="create_savepoint"
+        )
+
+    with patch("database.SessionLocal", side_effect=session_factory) as mock:
+        yield mock
+
+@pytest.fixture(scope="session")
+def seed_repo(test_db):
+    """
+    One repository per worker, committed outside the per-test transactions
+    (like the seeded user) so every test can see it. Tests that just need a
+    repo id take this instead of inserting their own — per-test SAVEPOINT
+    rollback keeps any modifications isolated while the row persists.
+    """
+    from models import Repository
+    db = _get_session_factory()()
+    repo = db.query(Repository).filter_by(name="seed-repo").first()
+    if not repo:
+        repo = Repository(
+            name="seed-repo",
+            owner="seed",
+            github_url="https://github.com/seed/seed.git",
+            created_by_user_id=1
+        )
+        db.add(repo)
+        db.commit()
+    repo_id = repo.id
+    db.close()
+    return repo_id
+
+@pytest.fixture(scope="session")
+def _app_env(test_db):
+    """
+    Shared app setup for the whole session: imports main, installs the auth
+    override, and seeds the test user, all paid once instead of per test.
+    """
+    import main
+
     # Override get_current_user dependency
     def mock_get_current_user():
         return {
@@ -56,11 +110,11 @@ def client(test_db, mock_session_local):
         }
 
     main.app.dependency_overrides[main.get_current_user] = mock_get_current_user
-    
-    # Create a user in the DB for foreign key constraints
-    db = TestingSessionLocal()
+
+    # Create a user in the DB for foreign key constraints. Committed outside
+    # any per-test transaction so every test can see it.
+    db = _get_session_factory()()
     from models import User
-    # Check if user exists first (though test_db should be fresh)
     if not db.query(User).filter_by(google_id="test_google_id").first():
         user = User(
             google_id="test_google_id",
@@ -72,11 +126,43 @@ def client(test_db, mock_session_local):
         db.commit()
     db.close()
 
-    with TestClient(main.app) as c:
-        yield c
-    
+    yield main.app
+
     main.app.dependency_overrides.clear()
 
+@pytest.fixture(scope="session")
+def app_client(_app_env):
+    """
+    Plain TestClient without the context manager: skips the startup/shutdown
+    lifespan, which no current test needs (the app registers no on_event
+    handlers).
+    """
+    yield TestClient(_app_env)
+
+@pytest.fixture(scope="session")
+def app_client_lifespan(_app_env):
+    """
+    Context-managed TestClient that runs the app lifespan; for tests that
+    need startup work (e.g. pool warmup) if any are added later.
+    """
+    with TestClient(_app_env) as c:
+        yield c
+
+@pytest.fixture(scope="function")
+def client(app_client, mock_session_local):
+    """
+    The shared lifespan-free client, combined with per-test DB patching and
+    rollback.
+    """
+    return app_client
+
+@pytest.fixture(scope="function")
+def client_lifespan(app_client_lifespan, mock_session_local):
+    """
+    Like client, but with the app lifespan running.
+    """
+    return app_client_lifespan
+
 @pytest.fixture
 def auth_headers():
     return {"Authorization": "Bearer mock_token"}
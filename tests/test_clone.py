@@ -1,28 +1,14 @@
 import pytest
 from unittest.mock import patch, MagicMock
 
-def test_repository_clone(client, auth_headers):
+from tests.jsonutil import post_json, resp_json
+
+def test_repository_clone(client, auth_headers, seed_repo):
     """Test cloning a repository that doesn't exist locally."""
-    
-    # Mock the database response for get_repository
-    # But since we are using a real (test) DB, we should insert a repo first.
-    
-    # 1. Create a repo in the DB
-    from models import Repository
-    from database import SessionLocal
-    
-    db = SessionLocal()
-    repo = Repository(
-        name="test-repo",
-        owner="test-owner",
-        github_url="https://github.com/test-owner/test-repo.git",
-        created_by_user_id=1 # Assuming the test user has ID 1
-    )
-    db.add(repo)
-    db.commit()
-    repo_id = repo.id
-    db.close()
-    
+
+    # 1. The session-scoped seed repository stands in for a per-test insert.
+    repo_id = seed_repo
+
     # 2. Mock subprocess.run to simulate git clone success
     with patch("subprocess.run") as mock_run:
         mock_run.return_value = MagicMock(returncode=0, stdout="Cloning into 'test-repo'...", stderr="")
@@ -40,46 +26,31 @@ def test_repository_clone(client, auth_headers):
         
         assert response.status_code in [200, 400] # 400 if already cloned
         if response.status_code == 200:
-            assert response.json()["status"] == "success"
+            assert resp_json(response)["status"] == "success"
 
-def test_code_execution(client, auth_headers):
+@pytest.mark.slow
+def test_code_execution(client, auth_headers, seed_repo):
     """Test code execution endpoint."""
     # This endpoint likely runs 'aider'. We should mock it.
     
-    with patch("subprocess.Popen") as mock_popen:
-        process_mock = MagicMock()
-        process_mock.stdout.readline.side_effect = [b"Output line 1\n", b"Output line 2\n", b""]
-        process_mock.poll.return_value = 0
-        process_mock.wait.return_value = 0
-        mock_popen.return_value = process_mock
-        
-        # We need a valid repo ID
-        # Reuse logic or create new repo
-        from models import Repository
-        from database import SessionLocal
-        db = SessionLocal()
-        repo = db.query(Repository).first()
-        if not repo:
-             repo = Repository(
-                name="test-repo-exec",
-                owner="test-owner",
-                github_url="https://github.com/test-owner/test-repo-exec.git",
-                created_by_user_id=1
-            )
-             db.add(repo)
-             db.commit()
-        repo_id = repo.id
-        db.close()
+    # run_aider drains aider through a single buffered subprocess.run call,
+    # so that is what gets mocked (there is no Popen/readline path).
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = MagicMock(
+            returncode=0, stdout="Output line 1\nOutput line 2\n", stderr=""
+        )
 
-        response = client.post(
+        # We need a valid repo ID — the session-scoped seed provides one.
+        repo_id = seed_repo
+
+        response = post_json(
+            client,
             "/update-code-by-id",
-            json={
-                "instructions": "Fix this bug",
-                "repo_id": repo_id
-            },
+            {"instructions": "Fix this bug", "repo_id": repo_id},
             headers=auth_headers
         )
-        
+
         assert response.status_code == 200
-        assert response.json()["status"] == "queued"
-        assert "job_id" in response.json()
\ No newline at end of file
+        result = resp_json(response)
+        assert result["status"] == "queued"
+        assert "job_id" in result
\ No newline at end of file
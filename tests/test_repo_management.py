@@ -3,23 +3,70 @@
 Test script for the updated repository management with auto-generated paths
 """
 
+import logging
 import requests
-import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# As a package module this resolves via the repo root; run as a standalone
+# script (python tests/test_repo_management.py) sys.path[0] is tests/, so
+# fall back to the sibling import.
+try:
+    from tests.jsonutil import post_json, resp_json
+except ImportError:
+    from jsonutil import post_json, resp_json
+
+# A logger with one stream handler instead of ~30 direct print calls:
+# messages go through the handler's buffered stream rather than a syscall
+# per line on an unbuffered pipe.
+logger = logging.getLogger("test_repo_management")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+logger.setLevel(logging.INFO)
 
 API_BASE = 'http://localhost:8000'
 API_KEY = 'change_this_to_a_strong_key'
 
+# One pooled session for the whole script: keep-alive instead of a fresh TCP
+# connection per call, with headers set once.
+SESSION = requests.Session()
+SESSION.headers.update({
+    'Authorization': f'Bearer {API_KEY}',
+    'Content-Type': 'application/json'
+})
+# Transient 502/503/504s become in-session retries with backoff instead of
+# failed steps, reusing the pooled connections.
+SESSION.mount('http://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=frozenset(["GET", "POST", "DELETE"])
+    )
+))
+
+# Default (connect, read) timeout on every call so a stalled server can't
+# hang the script; callers can still pass their own timeout=.
+_TIMEOUT = (3.0, 30.0)
+_session_request = SESSION.request
+
+def _request_with_timeout(method, url, **kwargs):
+    kwargs.setdefault("timeout", _TIMEOUT)
+    return _session_request(method, url, **kwargs)
+
+SESSION.request = _request_with_timeout
+
 def test_repository_management():
-    print("🧪 Testing Repository Management with Auto-Generated Paths")
-    print("=" * 60)
-    
-    headers = {
-        'Authorization': f'Bearer {API_KEY}',
-        'Content-Type': 'application/json'
-    }
-    
+    logger.info("🧪 Testing Repository Management with Auto-Generated Paths")
+    logger.info("=" * 60)
+
     # Test adding a repository
-    print("1. Adding a test repository...")
+    logger.info("1. Adding a test repository...")
     test_repo = {
         "name": "test-repo",
         "github_url": "https://github.com/testuser/test-repo",
@@ -29,67 +76,68 @@ def test_repository_management():
     }
     
     try:
-        response = requests.post(f'{API_BASE}/repositories', json=test_repo, headers=headers)
+        response = post_json(SESSION, f'{API_BASE}/repositories', test_repo)
         if response.status_code == 200:
-            result = response.json()
-            print(f"   ✅ Repository added successfully!")
-            print(f"   📍 Repo ID: {result['repo_id']}")
-            print(f"   📁 Local Path: {result['local_path']}")
+            result = resp_json(response)
+            logger.info(f"   ✅ Repository added successfully!")
+            logger.info(f"   📍 Repo ID: {result['repo_id']}")
+            logger.info(f"   📁 Local Path: {result['local_path']}")
             repo_id = result['repo_id']
         else:
-            print(f"   ❌ Error adding repository: {response.text}")
+            logger.info(f"   ❌ Error adding repository: {response.text}")
             return
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        logger.info(f"   ❌ Error: {e}")
         return
     
-    # Test getting all repositories
-    print("\n2. Getting all repositories...")
+    # The list and detail reads are independent — dispatch them together over
+    # the pooled session so server latency overlaps.
+    logger.info("\n2. Getting all repositories and repository details in parallel...")
     try:
-        response = requests.get(f'{API_BASE}/repositories', headers=headers)
-        if response.status_code == 200:
-            repos = response.json()
-            print(f"   ✅ Found {len(repos)} repositories")
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            all_future = executor.submit(SESSION.get, f'{API_BASE}/repositories')
+            one_future = executor.submit(SESSION.get, f'{API_BASE}/repositories/{repo_id}')
+            all_response = all_future.result()
+            one_response = one_future.result()
+
+        if all_response.status_code == 200:
+            repos = resp_json(all_response)
+            logger.info(f"   ✅ Found {len(repos)} repositories")
             for repo in repos:
-                print(f"   📂 {repo['name']} -> {repo['local_path']}")
+                logger.info(f"   📂 {repo['name']} -> {repo['local_path']}")
         else:
-            print(f"   ❌ Error getting repositories: {response.text}")
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
-    
-    # Test getting specific repository
-    print(f"\n3. Getting repository {repo_id}...")
-    try:
-        response = requests.get(f'{API_BASE}/repositories/{repo_id}', headers=headers)
-        if response.status_code == 200:
-            repo = response.json()
-            print(f"   ✅ Repository details:")
-            print(f"   📛 Name: {repo['name']}")
-            print(f"   🔗 URL: {repo['github_url']}")
-            print(f"   📁 Local Path: {repo['local_path']}")
-            print(f"   👤 Owner: {repo['owner']}")
-            print(f"   🌿 Branch: {repo['branch']}")
+            logger.info(f"   ❌ Error getting repositories: {all_response.text}")
+
+        logger.info(f"\n3. Repository {repo_id} details...")
+        if one_response.status_code == 200:
+            repo = resp_json(one_response)
+            logger.info(f"   ✅ Repository details:")
+            logger.info(f"   📛 Name: {repo['name']}")
+            logger.info(f"   🔗 URL: {repo['github_url']}")
+            logger.info(f"   📁 Local Path: {repo['local_path']}")
+            logger.info(f"   👤 Owner: {repo['owner']}")
+            logger.info(f"   🌿 Branch: {repo['branch']}")
         else:
-            print(f"   ❌ Error getting repository: {response.text}")
+            logger.info(f"   ❌ Error getting repository: {one_response.text}")
     except Exception as e:
-        print(f"   ❌ Error: {e}")
-    
+        logger.info(f"   ❌ Error: {e}")
+
     # Test deleting repository
-    print(f"\n4. Deleting test repository {repo_id}...")
+    logger.info(f"\n4. Deleting test repository {repo_id}...")
     try:
-        response = requests.delete(f'{API_BASE}/repositories/{repo_id}', headers=headers)
+        response = SESSION.delete(f'{API_BASE}/repositories/{repo_id}')
         if response.status_code == 200:
-            print("   ✅ Repository deleted successfully!")
+            logger.info("   ✅ Repository deleted successfully!")
         else:
-            print(f"   ❌ Error deleting repository: {response.text}")
+            logger.info(f"   ❌ Error deleting repository: {response.text}")
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        logger.info(f"   ❌ Error: {e}")
     
-    print(f"\n✅ Repository management test completed!")
-    print(f"📋 Features verified:")
-    print(f"   - Auto-generated local paths")
-    print(f"   - Base path configuration")
-    print(f"   - Repository CRUD operations")
+    logger.info(f"\n✅ Repository management test completed!")
+    logger.info(f"📋 Features verified:")
+    logger.info(f"   - Auto-generated local paths")
+    logger.info(f"   - Base path configuration")
+    logger.info(f"   - Repository CRUD operations")
 
 if __name__ == "__main__":
     test_repository_management()
@@ -1,7 +1,11 @@
 import asyncio
+import functools
 import logging
 import os
+import re
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -19,17 +23,37 @@ from database import RDBMS
 
 db = RDBMS()
 
-async def process_job(job: dict, repo: dict):
-    """Process a single job for a repository."""
+# Aider/git/scanner work is CPU-heavy; running it in worker processes keeps
+# the GIL free for the API event loop in the main process.
+_JOB_WORKERS = 2
+
+# Set by the API after enqueuing a job so the loop wakes immediately instead
+# of waiting out the poll interval. A threading.Event because the worker loop
+# runs on its own thread with its own event loop.
+_job_available = threading.Event()
+
+# Compiled once at import instead of per job inside run_job.
+_VULN_RE = re.compile(r"\[METADATA:VULN_ID:(\d+)\]")
+
+def notify_new_job():
+    """Wake the worker loop; called by the API after inserting a job."""
+    _job_available.set()
+
+def _worker_init():
+    """Drop pooled connections inherited across fork; each worker process
+    must talk to the DB over its own connections."""
+    from database import engine
+    engine.dispose(close=False)
+
+def run_job(job: dict, repo: dict):
+    """Execute a single job. Top-level and synchronous so the process pool
+    can pickle it; the caller has already marked the job as running."""
     job_id = job['id']
     repo_id = repo['id']
-    
+
     try:
         logger.info(f"🚀 Starting job {job_id} for repo {repo_id} ({repo['name']})")
-        
-        # Update job status to running
-        db.update_job_status(job_id, "running")
-        
+
         # Get repository path
         repo_path = Path(repo['local_path'])
         
@@ -47,8 +71,7 @@ async def process_job(job: dict, repo: dict):
         clean_instructions = job['instructions']
         vuln_id = None
         if "[METADATA:VULN_ID:" in clean_instructions:
-            import re
-            match = re.search(r"\[METADATA:VULN_ID:(\d+)\]", clean_instructions)
+            match = _VULN_RE.search(clean_instructions)
             if match:
                 vuln_id = int(match.group(1))
                 clean_instructions = clean_instructions.replace(match.group(0), "").strip()
@@ -87,6 +110,19 @@ async def process_job(job: dict, repo: dict):
         )
 
 
+def _reap_job(job_id: int, future):
+    """Surface executor-level failures run_job itself never sees (e.g.
+    BrokenProcessPool from a crashed child, pickling errors). Without this
+    the claimed job would sit in 'running' forever and block its repo's
+    queue, since the future's exception is dropped unretrieved."""
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"❌ Job {job_id} lost to an executor failure: {exc}", exc_info=exc)
+        db.update_job_status(job_id, "failed", error_message=str(exc))
+
+
 async def process_repositories():
     """Background worker that processes queued jobs per repository sequentially.
     
@@ -107,43 +143,33 @@ async def process_repositories():
     logger.info("Processing jobs sequentially per repository...")
     logger.info("Sequential rule: One job at a time per repo (pending → running → completed → approved/rejected)")
     logger.info("=" * 70)
-    
+
+    loop = asyncio.get_running_loop()
+    executor = ProcessPoolExecutor(max_workers=_JOB_WORKERS, initializer=_worker_init)
+
     while True:
         try:
-            # Get all active repositories
-            repos = db.get_all_repositories()
-            
-            if not repos:
-                logger.debug("No repositories found")
-            
-            for repo in repos:
+            # One query yields (repo, next pending job) for every repo that is
+            # free to run — repos with a running or completed-awaiting-approval
+            # job are filtered out in SQL instead of per-repo probes.
+            for repo, job in db.get_pending_jobs_by_repo():
                 repo_id = repo['id']
-                
-                # Check 1: If job is running, skip this repo
-                if db.has_running_job(repo_id):
-                    logger.debug(f"⏳ Repo {repo_id} ({repo['name']}) has a running job, waiting for completion")
-                    continue
-                
-                # Check 2: If a job is completed and awaiting approval, skip this repo
-                # (human must approve/reject before next job can start)
-                if db.has_completed_awaiting_approval(repo_id):
-                    logger.debug(f"⏸️  Repo {repo_id} ({repo['name']}) has a completed job awaiting approval")
-                    logger.debug(f"   Please approve/reject the PR before next job can start")
-                    continue
-                
-                # Check 3: Safe to get next pending job
-                job = db.get_next_job(repo_id)
-                if not job:
-                    continue
-                
                 logger.info(f"📋 Found pending job {job['id']} for repo {repo_id} ({repo['name']})")
                 logger.info(f"   Instructions: {job['instructions'][:80]}...")
-                
-                # Process the job (will mark as completed when done)
-                await process_job(job, repo)
+
+                # Atomic UPDATE ... RETURNING claim: mark-running and fetch in
+                # one round-trip, so a concurrent worker can't grab the same
+                # job. None means someone else claimed it between queries.
+                claimed = db.claim_next_job(repo_id)
+                if not claimed:
+                    continue
+                future = loop.run_in_executor(executor, run_job, claimed, repo)
+                future.add_done_callback(functools.partial(_reap_job, claimed['id']))
             
-            # Check for new jobs every 5 seconds
-            await asyncio.sleep(5)
+            # Wake as soon as the API enqueues a job, falling back to a
+            # 5-second tick to catch externally inserted work.
+            await loop.run_in_executor(None, _job_available.wait, 5.0)
+            _job_available.clear()
         
         except KeyboardInterrupt:
             logger.info("\n⏹️  Worker stopped by user")